@@ -15,4 +15,17 @@ class Config:
     TIMEZONE = os.environ.get("TIMEZONE", "Asia/Kathmandu")
     EXPIRY_SOON_DAYS = int(os.environ.get("EXPIRY_SOON_DAYS", "14"))
     CREDIT_OVERDUE_DAYS = int(os.environ.get("CREDIT_OVERDUE_DAYS", "30"))
+    # Upper bound (bytes) for rendered template fragments kept in memory per process
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get("FRAGMENT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    # Multi-store: comma separated store ids, each served from STORES_DIR/<store>.db.
+    # Leave STORES empty to run a single store on SQLALCHEMY_DATABASE_URI.
+    STORES = [s.strip() for s in os.environ.get("STORES", "").split(",") if s.strip()]
+    STORES_DIR = os.environ.get("STORES_DIR", os.path.join(BASE_DIR, "instance", "stores"))
+    DEFAULT_STORE = os.environ.get("DEFAULT_STORE") or (STORES[0] if STORES else None)
+    # Only owners logged into this store may see reports across all stores
+    OWNER_STORE = os.environ.get("OWNER_STORE") or None
+    # Per-store connection pool; defaults match SQLAlchemy's (5 + 10 overflow)
+    STORE_POOL_SIZE = int(os.environ.get("STORE_POOL_SIZE", "5"))
+    STORE_MAX_OVERFLOW = int(os.environ.get("STORE_MAX_OVERFLOW", "10"))
+    STORE_FANOUT_WORKERS = int(os.environ.get("STORE_FANOUT_WORKERS", "8"))
     DEBUG = os.environ.get("DEBUG", "True").lower() == "true"
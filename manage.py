@@ -1,6 +1,8 @@
 import click
-from shop import create_app, db
+from flask import g
+from shop import create_app, db, stores
 from shop.models import User
+from shop.lots import backfill_lots
 from passlib.hash import bcrypt
 
 app = create_app()
@@ -16,3 +18,31 @@ def db_init():
         db.session.commit()
         click.echo(f"Owner user created: owner / {pw}")
     click.echo("DB initialized.")
+
+@app.cli.command("lots-backfill")
+def lots_backfill():
+    """Move stock recorded before lot tracking into one lot per item."""
+    if not stores.enabled:
+        db.create_all()
+        click.echo(f"Created {backfill_lots()} lots.")
+        return
+    for store_id in stores.store_ids():
+        g.store = store_id
+        click.echo(f"{store_id}: created {backfill_lots()} lots.")
+        db.session.remove()
+
+@app.cli.command("store-init")
+@click.argument("store_id")
+@click.option("--password", prompt="Owner password", hide_input=True, confirmation_prompt=True)
+def store_init(store_id, password):
+    """Create a store database and its owner user."""
+    if store_id not in app.config["STORES"]:
+        click.echo(f"Note: {store_id} is not listed in STORES; it is still picked up from STORES_DIR.")
+    g.store = store_id
+    stores.engine(store_id)
+    if not User.query.filter_by(username="owner").first():
+        user = User(username="owner", role="owner", password_hash=bcrypt.hash(password))
+        db.session.add(user)
+        db.session.commit()
+        click.echo(f"Owner user created for {store_id}: owner")
+    click.echo(f"Store {store_id} initialized.")
@@ -1,11 +1,14 @@
-from flask import Flask
+from flask import Flask, g, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from jinja2 import FileSystemBytecodeCache
 from config import Config
+from .stores import StoreRegistry, StoreSession
 from os import makedirs
-from os.path import exists
+from os.path import exists, join
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": StoreSession})
+stores = StoreRegistry()
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 
@@ -16,7 +19,18 @@ def create_app():
     if not exists(app.instance_path):
         makedirs(app.instance_path)
 
+    # Compiled templates survive restarts; per-row fragments are cached in memory
+    from .cache import FragmentCache, FragmentCacheExtension
+    jinja_cache_dir = join(app.instance_path, "jinja_cache")
+    if not exists(jinja_cache_dir):
+        makedirs(jinja_cache_dir)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = FragmentCache(app.config["FRAGMENT_CACHE_MAX_BYTES"])
+    app.jinja_env.fragment_cache_scope = lambda: g.get("store")
+
     db.init_app(app)
+    stores.init_app(app)
     login_manager.init_app(app)
 
     from .auth import auth_bp
@@ -33,6 +47,19 @@ def create_app():
     app.register_blueprint(reports_bp, url_prefix="/reports")
     app.register_blueprint(alerts_bp, url_prefix="/alerts")
 
+    # One-time upgrade of a database from before lot tracking; store
+    # databases get the same when their engine is first opened.
+    if not stores.enabled:
+        from .lots import install_lots
+        with app.app_context():
+            install_lots(db.engine)
+
+    @app.before_request
+    def select_store():
+        # The store is chosen at login and kept in the session cookie
+        if stores.enabled:
+            g.store = session.get("store") or app.config["DEFAULT_STORE"]
+
     @app.route("/")
     def index():
         from flask import redirect, url_for
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template
 from flask_login import login_required
 from datetime import date, timedelta
-from .models import Item, CreditAccount, Alert
+from .models import Item, StockLot, CreditAccount, Alert
 from . import db
 
 alerts_bp = Blueprint("alerts", __name__, template_folder="templates")
@@ -21,11 +21,15 @@ def recalc_alerts_all():
     from config import Config
     soon_days = Config.EXPIRY_SOON_DAYS
     soon = date.today() + timedelta(days=soon_days)
-    exp_items = Item.query.filter(Item.expiry_date != None, Item.expiry_date <= soon).all()
-    for it in exp_items:
-        msg = f"Expiry soon: {it.name} ({it.expiry_date})"
+    # Range scan on the lot expiry index; one alert per expiring lot
+    exp_lots = db.session.query(StockLot, Item.name, Item.unit).join(Item) \
+        .filter(StockLot.expiry_date <= soon, StockLot.qty > 0) \
+        .order_by(StockLot.expiry_date).all()
+    for lot, name, unit in exp_lots:
+        label = f"lot {lot.lot_no}, " if lot.lot_no else ""
+        msg = f"Expiry soon: {name} ({label}{lot.qty} {unit}, {lot.expiry_date})"
         db.session.add(Alert(type="expiry", message=msg, severity="danger",
-                             item_id=it.id, due_date=it.expiry_date))
+                             item_id=lot.item_id, due_date=lot.expiry_date))
 
     # Credit overdue: outstanding > 0
     accts = CreditAccount.query.filter(CreditAccount.outstanding > 0).all()
@@ -1,20 +1,31 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, session, g
 from flask_login import login_user, logout_user, login_required, current_user
 from .forms import LoginForm
 from .models import User
-from . import db
+from . import db, stores
 
 auth_bp = Blueprint("auth", __name__, template_folder="templates")
 
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     form = LoginForm()
+    if stores.enabled and not form.store.data:
+        form.store.data = g.get("store")
     if form.validate_on_submit():
+        if stores.enabled:
+            store_id = (form.store.data or "").strip()
+            if store_id not in stores.store_ids():
+                flash("Unknown store", "danger")
+                return render_template("auth/login.html", form=form)
+            # Look the user up in the chosen store's database
+            g.store = store_id
         user = User.query.filter_by(username=form.username.data).first()
         if user and user.check_password(form.password.data):
             if not user.is_active:
                 flash("User is inactive", "warning")
                 return render_template("auth/login.html", form=form)
+            if stores.enabled:
+                session["store"] = g.store
             login_user(user)
             return redirect(url_for("reports.dashboard"))
         flash("Invalid credentials", "danger")
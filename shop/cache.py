@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from sys import getsizeof
+from threading import Lock
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+class FragmentCache:
+    """In-process LRU cache for rendered template fragments.
+
+    Bounded by the total size of the cached strings rather than the
+    number of entries, so a few large widgets can't push out thousands
+    of table rows (or the other way round).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        cost = getsizeof(value)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= getsizeof(old)
+            self._entries[key] = value
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= getsizeof(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+class FragmentCacheExtension(Extension):
+    """Adds a ``{% cache name, key... %}...{% endcache %}`` block.
+
+    The rendered body is stored under ``(name, key...)``. Callers should
+    pass something that changes whenever the fragment would, e.g. the
+    row's ``updated_at`` or a data version, so stale entries simply stop
+    being looked up and age out of the LRU.
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, fragment_cache_scope=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", [nodes.Tuple(args, "load")]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        if self.environment.fragment_cache_scope is not None:
+            key = (self.environment.fragment_cache_scope(),) + key
+        rv = cache.get(key)
+        if rv is None:
+            rv = caller()
+            cache.set(key, rv)
+        return rv
@@ -5,6 +5,7 @@ from wtforms.validators import DataRequired, Length, NumberRange, Optional
 class LoginForm(FlaskForm):
     username = StringField("Username", validators=[DataRequired(), Length(max=64)])
     password = PasswordField("Password", validators=[DataRequired()])
+    store = StringField("Store", validators=[Optional(), Length(max=64)])
     submit = SubmitField("Login")
 
 class ItemForm(FlaskForm):
@@ -22,6 +23,13 @@ class ItemForm(FlaskForm):
     notes = TextAreaField("Notes", validators=[Optional(), Length(max=500)])
     submit = SubmitField("Save")
 
+class LotForm(FlaskForm):
+    lot_no = StringField("Lot No", validators=[Optional(), Length(max=64)])
+    qty = DecimalField("Qty", places=2, validators=[DataRequired(), NumberRange(min=0.01)])
+    unit_cost = DecimalField("Unit Cost", places=2, validators=[Optional(), NumberRange(min=0)])
+    expiry_date = DateField("Expiry Date", validators=[Optional()])
+    submit = SubmitField("Receive")
+
 class UploadForm(FlaskForm):
     file = FileField("CSV File")
     submit = SubmitField("Upload")
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify
 from flask_login import login_required, current_user
-from .models import Item, StockMovement
+from .models import Item, StockLot
+from .lots import fefo_order, receive_lot, set_stock
 from . import db
 from datetime import date
 import io, csv
@@ -30,13 +31,13 @@ def create_item():
             sku=form.sku.data, name=form.name.data, category=form.category.data,
             unit=form.unit.data, cost_price=form.cost_price.data or 0,
             sale_price=form.sale_price.data or 0, tax_rate=form.tax_rate.data or 0,
-            stock_qty=form.stock_qty.data or 0, min_qty=form.min_qty.data or 0,
+            stock_qty=0, min_qty=form.min_qty.data or 0,
             expiry_date=form.expiry_date.data, supplier=form.supplier.data, notes=form.notes.data
         )
         db.session.add(item)
-        if item.stock_qty and item.stock_qty > 0:
-            m = StockMovement(item=item, type="adjustment", qty_change=item.stock_qty, unit_cost=item.cost_price, reason="Initial stock")
-            db.session.add(m)
+        if form.stock_qty.data and form.stock_qty.data > 0:
+            receive_lot(item, form.stock_qty.data, expiry_date=form.expiry_date.data,
+                        reason="Initial stock", movement="adjustment")
         db.session.commit()
         flash("Item created", "success")
         return redirect(url_for("inventory.list_items"))
@@ -50,6 +51,10 @@ def edit_item(item_id):
     form = ItemForm(obj=item)
     if not can_edit_cost():
         del form.cost_price
+    # Once stock is in lots, expiry dates are managed per lot
+    has_lots = item.lots.first() is not None
+    if has_lots:
+        del form.expiry_date
     if form.validate_on_submit():
         item.sku = form.sku.data
         item.name = form.name.data
@@ -59,15 +64,35 @@ def edit_item(item_id):
             item.cost_price = form.cost_price.data or 0
         item.sale_price = form.sale_price.data or 0
         item.tax_rate = form.tax_rate.data or 0
-        item.stock_qty = form.stock_qty.data or 0
         item.min_qty = form.min_qty.data or 0
-        item.expiry_date = form.expiry_date.data
+        expiry_date = None
+        if not has_lots:
+            expiry_date = item.expiry_date = form.expiry_date.data
+        set_stock(item, form.stock_qty.data, expiry_date, reason="Edited")
         item.supplier = form.supplier.data
         item.notes = form.notes.data
         db.session.commit()
         flash("Item updated", "success")
         return redirect(url_for("inventory.list_items"))
-    return render_template("inventory/edit.html", form=form, item=item)
+    return render_template("inventory/edit.html", form=form, item=item, has_lots=has_lots)
+
+@inventory_bp.route("/<int:item_id>/lots", methods=["GET", "POST"])
+@login_required
+def item_lots(item_id):
+    from .forms import LotForm
+    item = Item.query.get_or_404(item_id)
+    form = LotForm()
+    if not can_edit_cost():
+        del form.unit_cost
+    if form.validate_on_submit():
+        unit_cost = form.unit_cost.data if can_edit_cost() else None
+        receive_lot(item, form.qty.data, expiry_date=form.expiry_date.data,
+                    unit_cost=unit_cost, lot_no=form.lot_no.data or None)
+        db.session.commit()
+        flash("Lot received", "success")
+        return redirect(url_for("inventory.item_lots", item_id=item.id))
+    lots = item.lots.filter(StockLot.qty > 0).order_by(*fefo_order()).all()
+    return render_template("inventory/lots.html", item=item, lots=lots, form=form)
 
 @inventory_bp.route("/import", methods=["GET", "POST"])
 @login_required
@@ -91,14 +116,17 @@ def import_items():
             item.cost_price = float(row.get("cost_price") or 0)
             item.sale_price = float(row.get("sale_price") or 0)
             item.tax_rate = float(row.get("tax_rate") or 0)
-            item.stock_qty = float(row.get("stock_qty") or 0)
             item.min_qty = float(row.get("min_qty") or 0)
             exp = (row.get("expiry_date") or "").strip()
+            expiry = None
             if exp:
                 try:
-                    item.expiry_date = date.fromisoformat(exp)
+                    expiry = date.fromisoformat(exp)
                 except:
                     pass
+            if expiry and not item.lots.first():
+                item.expiry_date = expiry
+            set_stock(item, row.get("stock_qty") or 0, expiry, reason="CSV import")
             item.supplier = row.get("supplier") or None
             item.notes = row.get("notes") or None
             count += 1
@@ -0,0 +1,139 @@
+from decimal import Decimal
+from sqlalchemy import case, exists, func, insert, inspect, literal, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from .models import Item, StockLot, StockMovement, utcnow
+from . import db
+
+CENT = Decimal("0.01")
+
+def fefo_order():
+    # First-expiry-first-out; lots without an expiry date go last
+    return (StockLot.expiry_date.asc().nulls_last(), StockLot.id)
+
+def untracked_stock_insert(item_ids=None):
+    """INSERT..SELECT giving each stocked item that has no lots yet a single
+    lot for its current stock (stock recorded before lots were tracked).
+
+    One statement, so concurrent workers can't create the lot twice.
+    """
+    src = select(Item.id, Item.stock_qty, Item.cost_price, Item.expiry_date,
+                 literal(utcnow(), db.DateTime)) \
+        .where(Item.stock_qty > 0, ~exists().where(StockLot.item_id == Item.id))
+    if item_ids is not None:
+        src = src.where(Item.id.in_(list(item_ids)))
+    return insert(StockLot).from_select(["item_id", "qty", "unit_cost", "expiry_date", "received_at"], src)
+
+def install_lots(engine):
+    """One-time upgrade of a database that predates lot tracking.
+
+    Creates the missing tables and moves existing stock into lots. Does
+    nothing once the lot table exists, so it is cheap to call at startup.
+    """
+    if inspect(engine).has_table(StockLot.__tablename__):
+        return False
+    try:
+        db.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.execute(untracked_stock_insert())
+            session.commit()
+    except OperationalError:
+        # Another worker is doing the same upgrade
+        return False
+    return True
+
+def ensure_lots(item_ids=None):
+    """Make sure the stock of ``item_ids`` (default: every item) is held in lots."""
+    if item_ids is not None and not item_ids:
+        return 0
+    db.session.flush()
+    return db.session.execute(untracked_stock_insert(item_ids)).rowcount
+
+def receive_lot(item, qty, expiry_date=None, unit_cost=None, lot_no=None, reason="Purchase", movement="purchase"):
+    """Add a lot of ``qty`` to ``item`` and record the stock movement."""
+    qty = Decimal(qty)
+    if item.id is not None:
+        ensure_lots([item.id])
+    unit_cost = item.cost_price if unit_cost is None else unit_cost
+    lot = StockLot(item=item, lot_no=lot_no, qty=qty, unit_cost=unit_cost, expiry_date=expiry_date)
+    db.session.add(lot)
+    db.session.add(StockMovement(item=item, type=movement, qty_change=qty, unit_cost=unit_cost, reason=reason))
+    on_hand = Decimal(item.stock_qty or 0)
+    item.stock_qty = on_hand + qty
+    if on_hand <= 0 or (expiry_date and (item.expiry_date is None or expiry_date < item.expiry_date)):
+        item.expiry_date = expiry_date
+    return lot
+
+def allocate_fefo(needs):
+    """Take stock out of lots, earliest expiry first.
+
+    ``needs`` maps item_id -> qty. A single windowed query picks every lot
+    that contributes to an allocation; the lots are then updated in one
+    bulk statement. Returns item_id -> [(lot_id, qty_taken), ...].
+    Raises ValueError if an item's lots can't cover its quantity; the
+    caller is expected to roll back.
+    """
+    if not needs:
+        return {}
+    ensure_lots(list(needs))
+    # Rounded in SQL: SQLite sums NUMERIC as floats
+    taken_before = func.round(func.sum(StockLot.qty).over(partition_by=StockLot.item_id,
+                                                          order_by=fefo_order()) - StockLot.qty, 2)
+    ranked = select(StockLot.id, StockLot.item_id, StockLot.qty, taken_before.label("before")) \
+        .where(StockLot.item_id.in_(list(needs)), StockLot.qty > 0).subquery()
+    need = case({iid: qty for iid, qty in needs.items()}, value=ranked.c.item_id)
+    rows = db.session.execute(select(ranked).where(ranked.c.before < need)).all()
+
+    allocations = {}
+    updates = []
+    for lot_id, item_id, qty, before in rows:
+        qty = Decimal(str(qty)).quantize(CENT)
+        before = Decimal(str(before)).quantize(CENT)
+        take = min(qty, Decimal(needs[item_id]).quantize(CENT) - before)
+        if take <= 0:
+            continue
+        allocations.setdefault(item_id, []).append((lot_id, take))
+        updates.append({"id": lot_id, "qty": qty - take})
+    for item_id, qty in needs.items():
+        taken = sum((take for _, take in allocations.get(item_id, [])), Decimal("0"))
+        if taken < Decimal(qty).quantize(CENT):
+            raise ValueError(f"Not enough stock in lots for item {item_id}: need {qty}, have {taken}")
+    if updates:
+        db.session.execute(update(StockLot), updates)
+    return allocations
+
+def refresh_expiry(item_ids):
+    """Recompute Item.expiry_date as the earliest expiry among stocked lots.
+
+    Items without any lot keep their own expiry date.
+    """
+    if not item_ids:
+        return
+    with_lots = {iid for (iid,) in db.session.query(StockLot.item_id)
+                 .filter(StockLot.item_id.in_(list(item_ids))).distinct()}
+    if not with_lots:
+        return
+    earliest = dict(db.session.query(StockLot.item_id, func.min(StockLot.expiry_date))
+                    .filter(StockLot.item_id.in_(with_lots), StockLot.qty > 0)
+                    .group_by(StockLot.item_id).all())
+    for item in Item.query.filter(Item.id.in_(with_lots)):
+        item.expiry_date = earliest.get(item.id)
+
+def set_stock(item, qty, expiry_date=None, reason="Adjustment"):
+    """Bring ``item`` to ``qty`` by receiving a new lot or consuming FEFO."""
+    qty = Decimal(qty or 0)
+    delta = qty - Decimal(item.stock_qty or 0)
+    if delta > 0:
+        receive_lot(item, delta, expiry_date=expiry_date, reason=reason, movement="adjustment")
+    elif delta < 0:
+        allocate_fefo({item.id: -delta})
+        db.session.add(StockMovement(item=item, type="adjustment", qty_change=delta,
+                                     unit_cost=item.cost_price, reason=reason))
+        item.stock_qty = qty
+        refresh_expiry([item.id])
+
+def backfill_lots():
+    """Give every stocked item without lots a single lot for its current stock."""
+    count = ensure_lots()
+    db.session.commit()
+    return count
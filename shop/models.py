@@ -43,6 +43,22 @@ class Item(db.Model):
     updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow, nullable=False)
 
     movements = relationship("StockMovement", backref="item", lazy="dynamic")
+    lots = relationship("StockLot", backref="item", lazy="dynamic", cascade="all, delete-orphan")
+
+class StockLot(db.Model):
+    """A received batch of an item. Item.stock_qty is the sum of its lots."""
+    __table_args__ = (
+        db.Index("ix_stock_lot_item_expiry", "item_id", "expiry_date"),
+        db.Index("ix_stock_lot_expiry", "expiry_date"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey("item.id"), nullable=False)
+    lot_no = db.Column(db.String(64))
+    qty = db.Column(db.Numeric(12,2), nullable=False, default=0)
+    unit_cost = db.Column(db.Numeric(12,2), default=0)
+    expiry_date = db.Column(db.Date)
+    received_at = db.Column(db.DateTime, default=utcnow, nullable=False)
 
 class StockMovement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
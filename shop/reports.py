@@ -1,13 +1,17 @@
-from flask import Blueprint, render_template, request, send_file
-from flask_login import login_required
+from flask import Blueprint, render_template, request, send_file, abort, current_app, g
+from flask_login import login_required, current_user
 from sqlalchemy import func
-from .models import Item, Sale, SaleItem
-from . import db
+from .models import Item, Sale, SaleItem, CreditAccount
+from . import db, stores
 from datetime import datetime, timedelta
 import io, csv
 
 reports_bp = Blueprint("reports", __name__, template_folder="templates")
 
+@reports_bp.app_context_processor
+def inject_store_access():
+    return {"can_view_all_stores": can_view_all_stores}
+
 @reports_bp.route("/dashboard")
 @login_required
 def dashboard():
@@ -16,12 +20,20 @@ def dashboard():
     week_ago = now - timedelta(days=7)
     sales_24h = db.session.query(func.coalesce(func.sum(Sale.total), 0)).filter(Sale.created_at >= day_ago).scalar() or 0
     sales_7d = db.session.query(func.coalesce(func.sum(Sale.total), 0)).filter(Sale.created_at >= week_ago).scalar() or 0
-    top_items = db.session.query(SaleItem.item_id, func.sum(SaleItem.qty).label("qty")) \
-        .group_by(SaleItem.item_id).order_by(func.sum(SaleItem.qty).desc()).limit(5).all()
-    top_items_detail = [(Item.query.get(iid), qty) for iid, qty in top_items]
+    # Top items only change with new sales or item edits; the widget is
+    # fragment-cached on that version and only queried on a cache miss.
+    data_version = (db.session.query(func.max(SaleItem.id)).scalar(),
+                    db.session.query(func.max(Item.updated_at)).scalar())
+
+    def top_items():
+        rows = db.session.query(SaleItem.item_id, func.sum(SaleItem.qty).label("qty")) \
+            .group_by(SaleItem.item_id).order_by(func.sum(SaleItem.qty).desc()).limit(5).all()
+        return [(Item.query.get(iid), qty) for iid, qty in rows]
+
     low_stock = Item.query.filter(Item.stock_qty <= Item.min_qty).count()
     return render_template("dashboard.html",
-                           sales_24h=sales_24h, sales_7d=sales_7d, top_items=top_items_detail, low_stock=low_stock)
+                           sales_24h=sales_24h, sales_7d=sales_7d, top_items=top_items,
+                           data_version=data_version, low_stock=low_stock)
 
 @reports_bp.route("/export/sales")
 @login_required
@@ -44,3 +56,59 @@ def export_sales():
     output.seek(0)
     return send_file(io.BytesIO(output.getvalue().encode()), mimetype="text/csv",
                      as_attachment=True, download_name="sales.csv")
+
+def can_view_all_stores():
+    owner_store = current_app.config["OWNER_STORE"]
+    return (stores.enabled and owner_store is not None and g.get("store") == owner_store
+            and getattr(current_user, "role", "") == "owner")
+
+def store_summary(session, day_ago, week_ago):
+    def total_since(since):
+        return session.query(func.coalesce(func.sum(Sale.total), 0)).filter(Sale.created_at >= since).scalar() or 0
+    return {
+        "sales_24h": total_since(day_ago),
+        "sales_7d": total_since(week_ago),
+        "low_stock": session.query(func.count(Item.id)).filter(Item.stock_qty <= Item.min_qty).scalar(),
+        "outstanding": session.query(func.coalesce(func.sum(CreditAccount.outstanding), 0)).scalar() or 0,
+    }
+
+@reports_bp.route("/stores")
+@login_required
+def stores_overview():
+    if not can_view_all_stores():
+        abort(403)
+    now = datetime.utcnow()
+    day_ago = now - timedelta(days=1)
+    week_ago = now - timedelta(days=7)
+    rows = stores.fan_out(lambda s, store_id: store_summary(s, day_ago, week_ago))
+    totals = {k: sum(r[k] for _, r in rows) for k in ("sales_24h", "sales_7d", "low_stock", "outstanding")}
+    return render_template("reports/stores.html", rows=rows, totals=totals)
+
+@reports_bp.route("/export/stores/sales")
+@login_required
+def export_store_sales():
+    if not can_view_all_stores():
+        abort(403)
+    start = request.args.get("start")
+    end = request.args.get("end")
+
+    def fetch(session, store_id):
+        q = session.query(Sale)
+        if start:
+            q = q.filter(Sale.created_at >= datetime.fromisoformat(start))
+        if end:
+            q = q.filter(Sale.created_at <= datetime.fromisoformat(end))
+        return [(s.invoice_no, s.customer_name or "", s.payment_method, s.subtotal, s.tax, s.discount,
+                 s.total, s.paid_amount, s.change_due, s.created_at) for s in q.all()]
+
+    merged = [(store_id,) + row for store_id, rows in stores.fan_out(fetch) for row in rows]
+    merged.sort(key=lambda r: r[-1])
+    output = io.StringIO()
+    w = csv.writer(output)
+    w.writerow(["store", "invoice_no", "customer_name", "method", "subtotal", "tax",
+                "discount", "total", "paid", "change", "created_at"])
+    for r in merged:
+        w.writerow(r[:-1] + (r[-1].isoformat(),))
+    output.seek(0)
+    return send_file(io.BytesIO(output.getvalue().encode()), mimetype="text/csv",
+                     as_attachment=True, download_name="sales_all_stores.csv")
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from .models import Item, Sale, SaleItem, StockMovement, CreditAccount, CreditTxn, OnlinePayment
+from .lots import allocate_fefo, refresh_expiry
 from . import db
 from sqlalchemy import func
 from datetime import datetime
@@ -83,6 +84,8 @@ def cart():
         db.session.add(sale)
         db.session.flush()
         try:
+            # pull the sold quantities out of lots, earliest expiry first
+            allocate_fefo({item.id: qty for (item, qty, price, taxrate) in items})
             for (item, qty, price, taxrate) in items:
                 si = SaleItem(sale_id=sale.id, item_id=item.id, qty=qty,
                               unit_price=price, tax_rate=taxrate,
@@ -93,6 +96,7 @@ def cart():
                 mv = StockMovement(item_id=item.id, type="sale", qty_change=-qty,
                                    unit_cost=item.cost_price, reason=f"Sale {sale.invoice_no}")
                 db.session.add(mv)
+            refresh_expiry([item.id for (item, qty, price, taxrate) in items])
         except Exception:
             db.session.rollback()
             flash("Error processing sale", "danger")
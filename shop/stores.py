@@ -0,0 +1,108 @@
+import atexit
+import re
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir, makedirs
+from os.path import exists, join
+from threading import Lock
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+STORE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def valid_store_id(store_id):
+    return bool(store_id) and STORE_ID_RE.match(store_id) is not None
+
+class StoreSession(FlaskSession):
+    """Session that routes to the current request's store database.
+
+    When ``g.store`` is set, every query goes to that store's engine;
+    otherwise the normal ``SQLALCHEMY_DATABASE_URI`` is used, so a
+    single-store deployment behaves exactly as before.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            store_id = g.get("store")
+            if store_id:
+                return current_app.extensions["stores"].engine(store_id)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+class StoreRegistry:
+    """Lazily creates one engine (and connection pool) per store.
+
+    Each store lives in ``STORES_DIR/<store>.db``. A new or pre-lot store
+    database gets its tables (and lots) the first time its engine is
+    opened.
+    """
+
+    def __init__(self, app=None):
+        self._engines = {}
+        self._lock = Lock()
+        # Close every store's pooled connections when the process exits
+        atexit.register(self.dispose)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.stores_dir = app.config["STORES_DIR"]
+        self.configured = list(app.config["STORES"])
+        self.pool_size = app.config["STORE_POOL_SIZE"]
+        self.max_overflow = app.config["STORE_MAX_OVERFLOW"]
+        app.extensions["stores"] = self
+
+    @property
+    def enabled(self):
+        return bool(self.configured)
+
+    def store_ids(self):
+        """Configured stores plus any store database found on disk."""
+        ids = set(self.configured)
+        if exists(self.stores_dir):
+            ids.update(f[:-3] for f in listdir(self.stores_dir) if f.endswith(".db"))
+        return sorted(s for s in ids if valid_store_id(s))
+
+    def engine(self, store_id):
+        if not valid_store_id(store_id):
+            raise ValueError(f"Invalid store id: {store_id!r}")
+        engine = self._engines.get(store_id)
+        if engine is not None:
+            return engine
+        with self._lock:
+            engine = self._engines.get(store_id)
+            if engine is None:
+                from .lots import install_lots
+                if not exists(self.stores_dir):
+                    makedirs(self.stores_dir)
+                path = join(self.stores_dir, f"{store_id}.db").replace("\\", "/")
+                engine = create_engine(f"sqlite:///{path}", pool_size=self.pool_size,
+                                       max_overflow=self.max_overflow)
+                install_lots(engine)
+                self._engines[store_id] = engine
+        return engine
+
+    def fan_out(self, fn, store_ids=None, max_workers=None):
+        """Run ``fn(session, store_id)`` against each store in parallel.
+
+        Returns a list of ``(store_id, result)`` in store order. Each call
+        gets its own short-lived session bound to that store's engine, so
+        ``fn`` must not touch ``db.session``.
+        """
+        store_ids = list(store_ids if store_ids is not None else self.store_ids())
+        if not store_ids:
+            return []
+
+        def run(store_id):
+            with Session(self.engine(store_id)) as session:
+                return fn(session, store_id)
+
+        workers = max_workers or current_app.config["STORE_FANOUT_WORKERS"]
+        with ThreadPoolExecutor(max_workers=min(workers, len(store_ids))) as pool:
+            return list(zip(store_ids, pool.map(run, store_ids)))
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()